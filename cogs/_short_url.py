@@ -49,11 +49,7 @@ class DataManager(DatabaseManager):
         await cursor.delete(self.DB, target)
 
     async def getall(self, cursor, user_id: int) -> list:
-        return [
-            row async for row in cursor.get_datas(
-                self.DB, {"UserID": user_id}
-            ) if row
-        ]
+        return await cursor.get_datas(self.DB, {"UserID": user_id})
 
     async def get(self, cursor, custom: str) -> str:
         target = {"Custom": custom}
@@ -43,8 +43,7 @@ class DataManager(DatabaseManager):
         await cursor.insert_data(self.DB, delete_target)
 
     async def reads(self, cursor) -> list:
-        return [row async for row in cursor.get_datas(self.DB, {})
-                if row]
+        return await cursor.get_datas(self.DB, {})
 
     async def delete(self, cursor, channel_id: int, message_id: int) -> None:
         target = {"ChannelID": channel_id, "MessageID": message_id}
@@ -29,10 +29,7 @@ class DataManager(DatabaseManager):
     ) -> None:
         target = {"GuildID": guild_id}
         change = {"Date": date, "ChannelID": channel_id, "MessageID": message_id}
-        if len(
-            [row async for row in cursor.get_datas(self.DB, target)
-             if row]
-        ) < self.maxsize:
+        if len(await cursor.get_datas(self.DB, target)) < self.maxsize:
             target.update(change)
             await cursor.insert_data(self.DB, target)
         else:
@@ -53,7 +50,7 @@ class DataManager(DatabaseManager):
 
     async def reads(self, cursor) -> dict:
         data = {}
-        async for row in cursor.get_datas(self.DB, {}):
+        for row in await cursor.get_datas(self.DB, {}):
             if row:
                 if row[0] not in data:
                     data[row[0]] = []
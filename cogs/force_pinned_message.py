@@ -32,7 +32,7 @@ class DataManager(OldDatabaseManager):
         await self._update_cache(cursor)
 
     async def _update_cache(self, cursor):
-        async for row in cursor.get_datas(self.TABLE, {}):
+        for row in await cursor.get_datas(self.TABLE, {}):
             if row:
                 self.cache[row[0]].append(row[1])
 
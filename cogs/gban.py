@@ -40,7 +40,7 @@ class DataManager(DatabaseManager):
             raise ValueError("そのユーザーが見つかりませんでした。")
 
     async def getall(self, cursor) -> list:
-        return [row async for row in cursor.get_datas("gban", {})]
+        return await cursor.get_datas("gban", {})
 
     async def get(self, cursor, user_id: int) -> tuple:
         target = {"UserID": user_id}
@@ -36,12 +36,7 @@ class DataManager(DatabaseManager):
     async def load_globalchat_channels(self, cursor, name: str) -> list:
         target = {"Name": name}
         if await cursor.exists("globalChat", target):
-            return [
-                data
-                async for data in cursor.get_datas(
-                    "globalChat", target
-                )
-            ]
+            return await cursor.get_datas("globalChat", target)
         else:
             return []
 
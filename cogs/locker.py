@@ -32,7 +32,7 @@ class DataManager(DatabaseManager):
         return await cursor.exists("Locker", {"ChannelID": channel_id})
 
     async def loads(self, cursor) -> list:
-        return [row async for row in cursor.get_datas("Locker", {})]
+        return await cursor.get_datas("Locker", {})
 
 
 class Locker(commands.Cog, DataManager):
@@ -6,7 +6,7 @@ from typing import (
     TYPE_CHECKING, TypedDict, Type, Callable, Literal, Union, Optional, Any
 )
 
-from time import time
+from time import monotonic
 
 import discord
 from jishaku.functools import executor_function
@@ -43,6 +43,12 @@ FFMPEG_BEFORE_OPTIONS = "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max
 FFMPEG_OPTIONS = "-vn"
 
 
+#   再生中の音楽の埋め込みに使う文字列
+EMBED_TITLE = "Now playing"
+FIELD_TITLE = "Title"
+FIELD_ELAPSED = "Time"
+
+
 #   型等
 class MusicTypes:
     "何のサービスの音楽かです。"
@@ -125,6 +131,7 @@ class Music:
         self._start, self._stop = 0.0, 0.0
         self._made_source = False
         self.closed = False
+        self._embed_cache: dict[tuple[bool, int], discord.Embed] = {}
 
         self.on_close = lambda : None
 
@@ -256,14 +263,16 @@ class Music:
 
     def start(self) -> None:
         "途中経過の計算用の時間を計測を開始する関数です。"
-        self._start = time()
+        self._start = monotonic()
 
     def toggle_pause(self):
         "途中経過の時間の計測を停止させます。また、停止後に実行した場合は計測を再開します。"
+        self._embed_cache.clear()
         if self._stop == 0.0:
-            self._stop = time()
+            self._stop = monotonic()
         else:
-            self._start += self._stop - self._start
+            # 一時停止していた時間の分だけ開始時間をずらす。
+            self._start += monotonic() - self._stop
             self._stop = 0.0
 
     @executor_function
@@ -285,7 +294,12 @@ class Music:
     @property
     def now(self) -> float:
         "何秒再生してから経過したかです。"
-        return time() - self._start
+        return (self._stop or monotonic()) - self._start
+
+    @property
+    def elapsed_seconds(self) -> int:
+        "何秒再生してから経過したかの整数です。"
+        return int(self.now)
 
     @property
     def formated_now(self) -> str:
@@ -328,12 +342,20 @@ class Music:
 
     def make_embed(self, seek_bar: bool = False) -> discord.Embed:
         "再生中の音楽を示す埋め込みを作成します。"
-        embed = discord.Embed(title="Now playing", color=self.cog.bot.Colors.normal)
-        if seek_bar:
-            embed.description = self.make_seek_bar()
-        embed.add_field(name="Title", value=self.marked_title)
         self._init_start()
-        embed.add_field(name="Time", value=self.elapsed)
-        embed.set_thumbnail(url=self.thumbnail)
-        embed.set_author(name=self.author.name, icon_url=getattr(self.author.avatar, "url", ""))
-        return embed
+        # 経過時間の秒数が同じ間は同じ内容になるので、作った埋め込みを使い回す。
+        if (embed := self._embed_cache.get(key := (seek_bar, self.elapsed_seconds))) is None:
+            self._embed_cache.clear()
+            embed = discord.Embed(title=EMBED_TITLE, color=self.cog.bot.Colors.normal)
+            if seek_bar:
+                embed.description = self.make_seek_bar()
+            embed.add_field(name=FIELD_TITLE, value=self.marked_title)
+            embed.add_field(name=FIELD_ELAPSED, value=self.elapsed)
+            embed.set_thumbnail(url=self.thumbnail)
+            avatar = self.author.avatar
+            embed.set_author(
+                name=self.author.name, icon_url="" if avatar is None else avatar.url
+            )
+            self._embed_cache[key] = embed
+        # 呼び出し元で埋め込みが変更されてもキャッシュに影響しないようにコピーを返す。
+        return embed.copy()
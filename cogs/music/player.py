@@ -6,7 +6,8 @@ from typing import TYPE_CHECKING, Union, Optional
 from enum import Enum
 
 from asyncio import Event
-from random import sample
+from collections import deque
+from random import shuffle
 
 import discord
 
@@ -38,7 +39,7 @@ class Player:
 
     def __init__(self, cog: MusicCog, guild: discord.Guild, voice_client: discord.VoiceClient):
         self.cog, self.guild = cog, guild
-        self.queues: list[Music] = []
+        self.queues: deque[Music] = deque()
         self._loop = LoopMode.none
         self.channel: Optional[discord.TextChannel] = None
         self.vc = voice_client
@@ -51,11 +52,6 @@ class Player:
         "デバッグ用とかっこつけるためのprintです。"
         self.cog.print(f"[{self}]", *args, **kwargs)
 
-    @property
-    def length(self) -> int:
-        "キューの長さを取得します。ただのエイリアス"
-        return len(self.queues)
-
     async def add_from_url(self, author: discord.Member, url: str) -> Optional[
         Union[NotAddedReason, Exception, list[Music]]
     ]:
@@ -71,7 +67,7 @@ class Player:
                 # もし検索結果が返ってきたのならそれをそのまま返す。
                 return data[0]
             # 量制限の確認をする。
-            if self.length + (queues_length := len(data[0])) > self.cog.max(author):
+            if len(self.queues) + (queues_length := len(data[0])) > self.cog.max(author):
                 return NotAddedReason.queue_many
             else:
                 self.print("Adding %s queues, Author: %s" % (queues_length, author))
@@ -86,7 +82,7 @@ class Player:
     def add(self, music: Music) -> Optional[NotAddedReason]:
         "渡されたMusicをqueueに追加します。"
         self.print("Adding queue: %s" % music)
-        if self.length >= self.cog.max(self.guild):
+        if len(self.queues) >= self.cog.max(self.guild):
             return NotAddedReason.queue_many
         else:
             self.queues.append(music)
@@ -102,11 +98,11 @@ class Player:
         # 音楽再生終了後のキューの処理をする。
         if self.vc.is_connected() and not self._skipped:
             if self._loop == LoopMode.all:
-                self.queues.append(self.queues.pop(0))
+                self.queues.rotate(-1)
             elif self._loop == LoopMode.none:
-                del self.queues[0]
+                self.queues.popleft()
         else:
-            del self.queues[0]
+            self.queues.popleft()
             self._skipped = False
 
     async def _after_play(self, e: Exception):
@@ -122,7 +118,9 @@ class Player:
 
         # 音源のお片付けをしてキューのcloseをしてキューを消す。
         self.print("Cleaning...")
-        await self.queues[0].stop(self._process_closed_queue)
+        await self.queues[0].stop()
+        # キューの操作は他のキューの操作と同時に行われないように、別スレッドではなくここで行う。
+        self._process_closed_queue()
 
         self._stopped.set()
 
@@ -193,8 +191,14 @@ class Player:
 
     def shuffle(self):
         "キューをシャッフルします。"
-        if self.queues:
-            self.queues[1:] = sample(self.queues[1:], len(self.queues[1:]))
+        if len(self.queues) > 2:
+            # dequeはランダムアクセスが遅いので、再生中の曲以外をリストにしてシャッフルしてから戻す。
+            now = self.queues.popleft()
+            queues = list(self.queues)
+            shuffle(queues)
+            self.queues.clear()
+            self.queues.extend(queues)
+            self.queues.appendleft(now)
 
     def loop(self, mode: Optional[LoopMode] = None) -> LoopMode:
         "ループを設定します。"
@@ -223,7 +227,7 @@ class Player:
 
         # キューが二個以上あるならキューを一個以外全部消す。
         if len(self.queues) > 1:
-            self.queues = self.queues[:1]
+            self.queues = deque((self.queues[0],))
 
         # 再生の停止をする。
         if self.vc.is_connected():
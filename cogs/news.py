@@ -41,9 +41,7 @@ class DataManager(DatabaseManager):
 
     async def get_news_all(self, cursor) -> list:
         # Newsを全て取得する。
-        return [row async for row in cursor.get_datas(
-                "news", {}, custom="ORDER BY id DESC")
-                if row]
+        return await cursor.get_datas("news", {}, custom="ORDER BY id DESC")
 
 
 class News(commands.Cog, DataManager):
@@ -1,66 +1,163 @@
 # RT - Rt Role
 
-from typing import Union
+from typing import Union, Optional
 
 from discord.ext import commands
 import discord
 
-from aiofiles import open as async_open
+from asyncio import Event, sleep
 from collections import defaultdict
-from ujson import loads, dumps
+from threading import Lock
+from ujson import load, dumps
 from os.path import exists
+from os import replace
 
 
 class RTRole(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.data = defaultdict(dict)
+        # (サーバーID, コマンド名)をキーとした、該当するRTロールのIDのリストのキャッシュです。
+        self._role_cache: dict[tuple[int, str], list[int]] = {}
+        # サーバーID -> 役職ID -> コマンド名のセット のインデックスです。
+        self._index: dict[str, dict[str, frozenset[str]]] = {}
+        # サーバーに`RT-`が名前にある役職があるかどうかのキャッシュです。
+        self._has_rt_named: dict[int, bool] = {}
         if exists("data/rtrole.json"):
             try:
-                with open("data/rtrole.json", "r") as f:
-                    self.data.update(loads(f.read()))
+                with open("data/rtrole.json", "rb") as f:
+                    self.data.update(load(f))
             except Exception as e:
                 print("Error on RTRole:", e)
         else:
             with open("data/rtrole.json", "w") as f:
                 f.write(r"{}")
+        self._build_index()
 
-        if not getattr(self, "did", False):
-            self.events = []
-            @bot.check
-            async def has_role(ctx):
-                if ctx.guild:
-                    if (roles := [
-                        r for r in ctx.guild.roles
-                        if "RT-" in r.name or (
-                            str(ctx.guild.id) in self.data
-                            and str(r.id) in self.data[str(ctx.guild.id)]
-                            and ctx.command.qualified_name in \
-                                self.data[str(ctx.guild.id)][str(r.id)].get(
-                                    "commands", ""
-                                )
-                            )
-                        ]
-                    ):
-                        channels = {
-                            role.id: [
-                                ch.id for ch in ctx.guild.text_channels
-                                if any(r.id == role.id for r in ch.changed_roles)
-                            ] for role in roles
-                        }
-                        return any(
-                            bool(ctx.author.get_role(role.id)) and (
-                                not channels or not channels[role.id] or \
-                                    ctx.channel.id in channels[role.id]
-                            ) for role in roles
-                        )
+        # セーブは少し待ってからまとめて行う。
+        self._save_event = Event()
+        # 変更の回数と書き込み済みの変更の回数です。この二つが違うならまだ書き込まれていない変更があります。
+        self._version = self._written = 0
+        self._write_lock = Lock()
+        self._saver = self.bot.loop.create_task(self._save_loop())
+
+        self.bot.dispatch("load_rtrole")
+
+    async def bot_check(self, ctx):
+        # コグと一緒に登録と解除がされるように、グローバルチェックはこのメソッドで行う。
+        if ctx.guild:
+            if (has_rt_named := self._has_rt_named.get(ctx.guild.id)) is None:
+                has_rt_named = self._has_rt_named[ctx.guild.id] = any(
+                    "RT-" in r.name for r in ctx.guild.roles
+                )
+            guild_index = self._index.get(str(ctx.guild.id))
+            if not has_rt_named and not guild_index:
+                # RTロールが一つもないサーバーでは役職を調べる必要はない。
                 return True
-            self.did = True
-            self.bot.dispatch("load_rtrole")
+            if (role_ids := self._role_cache.get(
+                key := (ctx.guild.id, command := ctx.command.qualified_name)
+            )) is None:
+                role_ids = self._role_cache[key] = [
+                    r.id for r in ctx.guild.roles
+                    if "RT-" in r.name or (
+                        guild_index is not None
+                        and command in guild_index.get(str(r.id), ())
+                    )
+                ]
+            if role_ids:
+                channels = {
+                    role_id: [
+                        ch.id for ch in ctx.guild.text_channels
+                        if any(r.id == role_id for r in ch.changed_roles)
+                    ] for role_id in role_ids
+                }
+                return any(
+                    bool(ctx.author.get_role(role_id)) and (
+                        not channels or not channels[role_id] or \
+                            ctx.channel.id in channels[role_id]
+                    ) for role_id in role_ids
+                )
+        return True
+
+    def _build_index(self) -> None:
+        # 設定からコマンド名のセットのインデックスを作ります。
+        self._index = {
+            gid: {
+                rid: frozenset(v.get("commands", "").split())
+                for rid, v in g.items() if v
+            } for gid, g in self.data.items()
+        }
+
+    def _clear_role_cache(self, guild_id: int) -> None:
+        # 指定されたサーバーのRTロールのキャッシュを消します。
+        for key in [key for key in self._role_cache if key[0] == guild_id]:
+            del self._role_cache[key]
+        self._has_rt_named.pop(guild_id, None)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        self._clear_role_cache(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role):
+        self._clear_role_cache(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        self._clear_role_cache(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self._clear_role_cache(role.guild.id)
+
+    def save(self, guild_id: Optional[int] = None):
+        if guild_id is None:
+            self._role_cache.clear()
+        else:
+            self._clear_role_cache(guild_id)
+        self._build_index()
+        self._version += 1
+        self._save_event.set()
+
+    def _write(self, data: str, version: int) -> None:
+        # 別スレッドからも呼ばれるのでロックをして、古い内容で上書きしないようにする。
+        with self._write_lock:
+            if version <= self._written:
+                return
+            # 一時ファイルに書いてから置き換えて、書き込みが途中で止まってもファイルが壊れないようにする。
+            with open("data/rtrole.json.tmp", "w", encoding="utf-8") as f:
+                f.write(data)
+            replace("data/rtrole.json.tmp", "data/rtrole.json")
+            self._written = version
+
+    def _dump(self) -> tuple[str, int]:
+        return dumps(self.data, ensure_ascii=False), self._version
+
+    async def _save_loop(self):
+        # 連続で設定された場合に何回も書き込まないように、少し待ってから一度に書き込む。
+        while True:
+            await self._save_event.wait()
+            await sleep(0.5)
+            self._save_event.clear()
+            try:
+                await self.bot.loop.run_in_executor(None, self._write, *self._dump())
+            except Exception as e:
+                print("Error on RTRole:", e)
+
+    def _flush(self) -> None:
+        # まだ書き込まれていない変更があればその場で書き込む。
+        if self._version > self._written:
+            self._write(*self._dump())
+
+    @commands.Cog.listener()
+    async def on_close(self, _):
+        self._saver.cancel()
+        self._flush()
 
-    async def save(self):
-        async with async_open("data/rtrole.json", "w") as f:
-            await f.write(dumps(self.data, ensure_ascii=True, indent=2))
+    def cog_unload(self):
+        # 再読み込みの際に新しいインスタンスが古い設定を読み込まないように、ここで書き込みを終わらせる。
+        self._saver.cancel()
+        self._flush()
 
     @commands.group(
         aliases=["rtロール", "りつロール", "rr"], extras={
@@ -125,7 +222,7 @@ class RTRole(commands.Cog):
             self.data[str(ctx.guild.id)][str(role.id)] = {
                 "commands": commands, "role_name": role.name
             }
-            await self.save()
+            self.save(ctx.guild.id)
             await ctx.reply("Ok")
         else:
             await ctx.reply("50個まで設定可能です。")
@@ -165,7 +262,7 @@ class RTRole(commands.Cog):
                     removed = True
 
             if removed:
-                await self.save()
+                self.save(ctx.guild.id)
                 await ctx.reply("Ok")
             else:
                 await ctx.reply("その役職は設定されていません。")
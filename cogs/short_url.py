@@ -48,11 +48,7 @@ class DataManager(DatabaseManager):
         await cursor.delete(self.DB, target)
 
     async def getall(self, cursor, user_id: int) -> list:
-        return [
-            row async for row in cursor.get_datas(
-                self.DB, {"UserID": user_id}
-            ) if row
-        ]
+        return await cursor.get_datas(self.DB, {"UserID": user_id})
 
     async def get(self, cursor, custom: str) -> str:
         target = {"Custom": custom}
@@ -60,9 +56,7 @@ class DataManager(DatabaseManager):
         return (await cursor.get_data(self.DB, target))[1]
 
     async def getrealall(self, cursor) -> list:
-        return [
-            row async for row in cursor.get_datas(self.DB, {}) if row
-        ]
+        return await cursor.get_datas(self.DB, {})
 
 
 CHARS = list(range(41, 91)) + list(range(61, 123))
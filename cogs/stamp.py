@@ -42,15 +42,10 @@ class DataManager(DatabaseManager):
     async def read(self, cursor, guild_id: int) -> Optional[tuple]:
         target = {"GuildID": guild_id}
         if await cursor.exists(self.DB, target):
-            return [
-                row
-                async for row in cursor.get_datas(
-                    self.DB, target
-                )
-            ]
+            return await cursor.get_datas(self.DB, target)
 
     async def reads(self, cursor) -> list:
-        return [row async for row in cursor.get_datas(self.DB, {})]
+        return await cursor.get_datas(self.DB, {})
 
 
 class Stamp(commands.Cog, DataManager):
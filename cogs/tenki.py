@@ -47,7 +47,7 @@ class DataManager(DatabaseManager):
             raise KeyError("そのユーザーは設定していません。")
 
     async def reads(self, cursor) -> list:
-        return [row async for row in cursor.get_datas(self.DB, {})]
+        return await cursor.get_datas(self.DB, {})
 
 i = -1
 PREFECTURES = [(data["@title"], i)
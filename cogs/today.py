@@ -40,11 +40,7 @@ class DataManager(DatabaseManager):
         target = {}
         if guild_id is not None:
             target["GuildID"] = guild_id
-        return [
-            row async for row in cursor.get_datas(
-                self.DB, target)
-            if row
-        ]
+        return await cursor.get_datas(self.DB, target)
 
 
 class Today(commands.Cog, DataManager):
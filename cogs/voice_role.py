@@ -53,7 +53,7 @@ class DataManager(DatabaseManager):
     async def _get_length(self, cursor, guild_id: int) -> int:
         target = {"GuildID": guild_id}
         if await cursor.exists(self.DB, target):
-            return len([row async for row in cursor.get_datas(self.DB, target)])
+            return len(await cursor.get_datas(self.DB, target))
         else:
             return 0
 
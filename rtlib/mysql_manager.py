@@ -1,18 +1,44 @@
 # RT Util - MySQL Manager
 
-from typing import Union, Any, Dict, Tuple
+from typing import Union, Any, Dict, List, Set, Tuple
 
 from asyncio import AbstractEventLoop, get_event_loop, iscoroutinefunction
 from aiomysql import create_pool, connect
+from pymysql.constants import FIELD_TYPE
 from pymysql.err import OperationalError
 from functools import wraps
+from sys import flags
 import warnings
+import weakref
 import ujson
 
 
 warnings.filterwarnings('ignore', module=r"aiomysql")
 
 
+# jsonが入っている可能性がある文字列の型です。
+TEXT_TYPES = frozenset((
+    FIELD_TYPE.VARCHAR, FIELD_TYPE.VAR_STRING, FIELD_TYPE.STRING,
+    FIELD_TYPE.TINY_BLOB, FIELD_TYPE.MEDIUM_BLOB, FIELD_TYPE.LONG_BLOB,
+    FIELD_TYPE.BLOB, FIELD_TYPE.JSON
+))
+
+
+def _is_json(data: Any) -> bool:
+    # jsonの辞書の文字列かどうかを調べます。
+    return isinstance(data, str) and data[:1] == "{" and data[-1:] == "}"
+
+
+def _loads_json(data: Any) -> Any:
+    # jsonの辞書の文字列なら辞書にします。jsonじゃなかった場合はそのまま返します。
+    if _is_json(data):
+        try:
+            return ujson.loads(data)
+        except ValueError:
+            pass
+    return data
+
+
 class Cursor:
     """データベースの操作を簡単に行うためのクラスです。  
     `Cursor.get_data`などの便利なものが使えます。  
@@ -43,16 +69,21 @@ class Cursor:
 
     Attributes
     ----------
-    loop : asyncio.AbstractEventLoop
-        イベントループです。
     connection
-        データベースとの接続です。
+        データベースとの接続です。  
+        `MySQLManager`がプールモードの場合は`Cursor.prepare_cursor`の実行時にプールから取得され、`Cursor.close`の実行時にプールに返されます。
+    pool
+        `MySQLManager`がプールモードの場合はそのプールです。
     cursor
         データベースの操作などに使うカーソルです。  
         `Cursor.prepare_cursor`を実行するまではこれは有効になりません。"""
+
+    # INSERTやUPDATEのSQLのキャッシュです。値は引数で渡すので列の組み合わせ毎に使い回せます。
+    _sql_cache: Dict[tuple, str] = {}
+
     def __init__(self, db):
-        self.cursor = None
-        self.loop, self.connection = db.loop, db.connection
+        self.cursor, self._acquired, self._finalizer = None, False, None
+        self.connection, self.pool = db.connection, db.pool
 
     async def prepare_cursor(self):
         """Cursorを使えるようにします。  
@@ -62,18 +93,30 @@ class Cursor:
         Notes
         -----
         これを使用する代わりに`async with`文を使用することが可能です。"""
+        if self.connection is None and self.pool is not None:
+            # プールモードの場合はプールからコネクションを取得する。
+            self.connection = await self.pool.acquire()
+            self._acquired = True
         self.cursor = await self.connection.cursor()
         self.cursor._defer_warnings = True
+        if flags.dev_mode:
+            # 開発モードの場合は閉じ忘れを警告するようにする。
+            self._finalizer = weakref.finalize(
+                self, warnings.warn, "Cursorが閉じられずに削除されました。",
+                ResourceWarning
+            )
 
     async def close(self):
         """Curosorを閉じます。"""
         if self.cursor is not None:
             await self.cursor.close()
             self.cursor = None
-
-    def __del__(self):
-        if not self.loop.is_closed():
-            self.loop.create_task(self.close())
+        if self._acquired:
+            self.pool.release(self.connection)
+            self.connection, self._acquired = None, False
+        if self._finalizer is not None:
+            self._finalizer.detach()
+            self._finalizer = None
 
     async def __aenter__(self):
         await self.prepare_cursor()
@@ -120,18 +163,25 @@ class Cursor:
             await self.connection.commit()
 
     def _get_column_args(
-            self, values: Dict[str, Any], format_text: str = "{} = %s AND ",
+            self, values: Dict[str, Any], format_text: str = "{} = %s",
             json_dump: bool = False
-        ) -> Tuple[str, list]:
-        conditions, args = "", []
-        for key in values:
-            conditions += format_text.format(key)
-            args.append(
-                ujson.dumps(values[key])
-                if json_dump and isinstance(values[key], dict)
-                else values[key]
-            )
-        return conditions, args
+        ) -> Tuple[List[str], list]:
+        # 列ごとのSQLの断片と値のリストを作ります。断片は呼び出し元で区切り文字で結合します。
+        return (
+            [format_text.format(key) for key in values],
+            self._get_args(values, json_dump)
+        )
+
+    @staticmethod
+    def _get_args(values: Dict[str, Any], json_dump: bool = False) -> list:
+        # SQLに渡す値のリストを作ります。
+        if json_dump:
+            # 辞書はjsonにして渡す。
+            return [
+                ujson.dumps(value) if isinstance(value, dict) else value
+                for value in values.values()
+            ]
+        return list(values.values())
 
     async def insert_data(
         self, table: str, values: Dict[str, Any],
@@ -155,14 +205,11 @@ class Cursor:
         async with db.get_cursor() as cursor:
             values = {"name": "Takkun", "data": {"detail": "愉快"}}
             await cursor.post_data("tasuren_friends", values)"""
-        conditions, args = self._get_column_args(
-            values, "{}, ", json_dump=True
-        )
-        query = ("%s, " * len(args))[:-2]
-        await self.cursor.execute(
-            f"INSERT INTO {table} ({conditions[:-2]}) VALUES ({query})",
-            args
-        )
+        if (query := self._sql_cache.get(key := ("INSERT", table, tuple(values)))) is None:
+            query = self._sql_cache[key] = "INSERT INTO {} ({}) VALUES ({})".format(
+                table, ", ".join(values), ", ".join(("%s",) * len(values))
+            )
+        await self.cursor.execute(query, self._get_args(values, True))
         if commit:
             await self.connection.commit()
 
@@ -183,15 +230,15 @@ class Cursor:
             更新するデータの条件です。
         commit : bool, default True
             更新後に自動で`MySQLManager.commit`を実行するかどうかです。"""
-        values, values_args = self._get_column_args(
-            values, "{} = %s, ", True
-        )
-        conditions, conditions_args = self._get_column_args(
-            targets, json_dump=True
-        )
+        if (query := self._sql_cache.get(
+            key := ("UPDATE", table, tuple(values), tuple(targets))
+        )) is None:
+            query = self._sql_cache[key] = "UPDATE {} SET {} WHERE {}".format(
+                table, ", ".join(f"{column} = %s" for column in values),
+                " AND ".join(f"{column} = %s" for column in targets)
+            )
         await self.cursor.execute(
-            f"UPDATE {table} SET {values[:-2]} WHERE {conditions[:-4]}",
-            values_args + conditions_args
+            query, self._get_args(values, True) + self._get_args(targets, True)
         )
         if commit:
             await self.connection.commit()
@@ -228,20 +275,43 @@ class Cursor:
             削除後に自動で`MySQLManager.commit`を実行するかどうかです。"""
         conditions, args = self._get_column_args(targets, json_dump=True)
         await self.cursor.execute(
-            f"DELETE FROM {table} WHERE {conditions[:-4]}",
+            f"DELETE FROM {table} WHERE {' AND '.join(conditions)}",
             args
         )
         if commit:
             await self.connection.commit()
 
+    def _get_json_columns(self) -> Set[int]:
+        # 実行したSELECTの結果のうち、jsonが入っている可能性がある文字列の列のインデックスを取得します。
+        # 同じ列に普通の文字列とjsonが混ざっていることがあるので、実際にjsonかどうかは値毎に調べます。
+        return {
+            index for index, column in enumerate(self.cursor.description or ())
+            if column[1] in TEXT_TYPES
+        }
+
+    def _get_where(self, targets: Dict[str, Any]) -> Tuple[str, Union[list, tuple]]:
+        # WHERE句とその引数を作ります。
+        if targets:
+            conditions, args = self._get_column_args(
+                targets, json_dump=True
+            )
+            return " WHERE " + " AND ".join(conditions), args
+        return "", ()
+
+    @staticmethod
+    def _decode_row(row: tuple, json_columns: Set[int]) -> list:
+        # 取得した行のjsonを辞書にします。
+        return [
+            _loads_json(data) if index in json_columns else data
+            for index, data in enumerate(row) if data is not None
+        ]
+
     async def get_datas(
         self, table: str, targets: Dict[str, Any],
-        _fetchall: bool = True, custom: str = "",
-        json: bool = False
+        custom: str = "", json: bool = False
     ) -> list:
         """特定のテーブルにある特定の条件のデータを取得します。  
-        見つからない場合は空である`[]`が返されます。  
-        ジェネレーターです。
+        見つからない場合は空である`[]`が返されます。
 
         Parameters
         ----------
@@ -250,52 +320,36 @@ class Cursor:
         targets : Dict[str, Any]
             取得するデータの条件です。
 
-        Yields
-        ------
+        Returns
+        -------
         list
             取得したデータのリストです。  
-            yieldで返され`[なにか, なにか, なにか, なにか]`のようになっています。  
+            それぞれのデータは`[なにか, なにか, なにか, なにか]`のようになっています。  
             もしjsonがあった場合は辞書になります。  
             見つからない場合は空である`[]`となります。
 
         Notes
         -----
         もし条件関係なく全てを取得したい場合は引数の`targets`を空である`{}`にしましょう。"""
-        if targets:
-            conditions, args = self._get_column_args(
-                targets, json_dump=True
-            )
-            conditions = " WHERE " + conditions[:-4]
-        else:
-            conditions, args = "", ()
+        conditions, args = self._get_where(targets)
         await self.cursor.execute(
             f"SELECT * FROM {table}{conditions}{' ' + custom if custom else custom}",
             args
         )
-        if _fetchall:
-            list_rows = await self.cursor.fetchall()
-        else:
-            list_rows = [await self.cursor.fetchone()]
-        if list_rows:
-            for rows in list_rows:
-                if rows is None:
-                    yield []
-                else:
-                    rows = [
-                        (
-                            (ujson.loads(row)
-                            if (row and row[0] == "{"
-                                and row[-1] == "}")
-                            else row)
-                            if isinstance(row, str) else row
-                        )
-                        for row in rows if row is not None
-                    ]
-                    yield rows
-                    if not _fetchall:
-                        break
-        else:
-            yield []
+        if rows := await self.cursor.fetchall():
+            json_columns = self._get_json_columns()
+            return [self._decode_row(row, json_columns) for row in rows]
+        return []
+
+    async def _fetch_one(self, table: str, targets: Dict[str, Any]) -> list:
+        # 一つだけデータを取得します。見つからない場合は`[]`を返します。
+        conditions, args = self._get_where(targets)
+        await self.cursor.execute(
+            f"SELECT * FROM {table}{conditions} LIMIT 1", args
+        )
+        if (row := await self.cursor.fetchone()) is None:
+            return []
+        return self._decode_row(row, self._get_json_columns())
 
     async def get_data(self, table: str, targets: Dict[str, Any], json: bool = False) -> list:
         """一つだけデータを取得します。  
@@ -311,7 +365,7 @@ class Cursor:
                 # -> "Takkun"
                 print(row[-1])
                 # -> {"detail": "愉快"} (辞書データ)"""
-        return [row async for row in self.get_datas(table, targets, _fetchall=False, json=json)][0]
+        return await self._fetch_one(table, targets)
 
 
 class MySQLManager:
@@ -325,9 +379,10 @@ class MySQLManager:
     データベースの操作はこのクラスにあるものだけではできません。  
     データベースの操作を行うなら`Cursor`を使いましょう。  
     `Cursor`は`MySQLManager.get_cursor`で定義済みのものを取得することができます。  
-    このクラスをプールモードで定義したの場合は、そのクラスは`get_cursor`や`commit`などが使用できません。  
-    これを使用する場合はプールからコネクションを取得する必要があります。  
-    これは`MySQLManager.get_database`から取得可能です。  
+    このクラスをプールモードで定義した場合は、`get_cursor`で取得した`Cursor`が使用時にプールからコネクションを取得して、閉じる際に返します。  
+    そのため複数のコグから同時に使ってもクエリが一つのコネクションで順番待ちになりません。  
+    ただし`commit`は使用できないので、`Cursor`の`commit`引数を使いましょう。  
+    プールから取得したコネクションを使い続けたい場合は`MySQLManager.get_database`から取得可能です。  
     これで取得したものはプールモードをオフにして定義したこのクラスと同等です。
 
     Parameters
@@ -356,9 +411,9 @@ class MySQLManager:
     async with db.get_cursor() as cursor:
         ...
     # プールとして使う場合
-    pool = rtutil.MySQLManager(
-        loop=bot.loop, user="root", password="I wanna be the guy", db="mysql")
-    db = pool.get_database()
+    db = rtutil.MySQLManager(
+        loop=bot.loop, user="root", password="I wanna be the guy", db="mysql",
+        pool=True)
     async with db.get_cursor() as cursor:
         ..."""
     def __init__(self, pool: bool = False, _pool_c=False, **kwargs):
@@ -369,6 +424,8 @@ class MySQLManager:
 
     async def _setup(self, pool, _pool_c, kwargs) -> None:
         # データベースの準備をする。
+        # utf8だと絵文字などの4バイトの文字が使えないのでutf8mb4にする。
+        kwargs.setdefault("charset", "utf8mb4")
         if pool and not _pool_c:
             self.pool = await create_pool(**kwargs)
         elif not _pool_c:
@@ -421,24 +478,10 @@ class DatabaseManager:
                         if iscoroutinefunction(coro):
                             setattr(cls, name, cls.prepare_cursor(coro))
 
-    async def _close(self, conn, cursor):
-        await cursor.close()
-        conn.close()
-        del cursor
-
     @staticmethod
     def prepare_cursor(coro):
         @wraps(coro)
         async def new_coro(self, *args, **kwargs):
-            conn = await self.db.get_database()
-            cursor = conn.get_cursor()
-            await cursor.prepare_cursor()
-            try:
-                data = await coro(self, cursor, *args, **kwargs)
-            except Exception as e:
-                await self._close(conn, cursor)
-                raise e
-            else:
-                await self._close(conn, cursor)
-                return data
+            async with self.db.get_cursor() as cursor:
+                return await coro(self, cursor, *args, **kwargs)
         return new_coro
\ No newline at end of file